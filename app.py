@@ -1,10 +1,13 @@
 import click
 import librosa
-import json
 import os
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import soundfile as sf
+
+from audio_features.core import compute_mfcc, compute_mfcc_batch, compute_mfcc_stream, to_json
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -22,50 +25,101 @@ Parameters:
 - Max frequency: Nyquist frequency (sr/2)
 - Power: Energy (2.0)
 """
-def calculate_mfcc(audio_path):
-    # Load audio with specific sampling rate
-    y, sr = librosa.load(audio_path, sr=44100)
+SAMPLE_RATE = 44100
+N_FFT = 4096
+HOP_LENGTH = 512
+
+# Seconds of audio collected before the spectrograms of a directory are computed together
+BATCH_SECONDS = 60
+
+# Files with more samples than this are decoded and analysed block by block
+STREAM_FRAMES = 10_000_000
+STREAM_BLOCKSIZE = 524288
 
-    # Calculate mel spectrogram with specified parameters
-    mel_spec = librosa.feature.melspectrogram(
-        y=y,
-        sr=sr,
-        n_fft=4096,
-        win_length=4096,
-        hop_length=512,
-        window='hann',
-        n_mels=40,
-        fmin=0.0,
-        fmax=sr/2,
-        power=2.0
-    )
+def load_audio(audio_path, stream=False):
+    # Load audio with specific sampling rate, downmixed to mono float32.
+    # With stream=True, a long file at the target rate (which needs no resampling)
+    # is returned as the open SoundFile instead, to be analysed block by block.
+    try:
+        f = sf.SoundFile(audio_path)
+    except sf.SoundFileRuntimeError:
+        # Formats libsndfile cannot open go through librosa's audioread fallback
+        y, _ = librosa.load(audio_path, sr=SAMPLE_RATE, mono=True, dtype=np.float32, res_type='soxr_qq')
+        return y
+    if stream and f.samplerate == SAMPLE_RATE and f.frames > STREAM_FRAMES:
+        return f
+    with f:
+        y, _ = librosa.load(f, sr=SAMPLE_RATE, mono=True, dtype=np.float32, res_type='soxr_qq')
+    return y
 
-    # Convert to log mel spectrogram
-    log_mel_spec = librosa.power_to_db(mel_spec, ref=np.max)
+def stream_mfcc(f):
+    # MFCC means of an open SoundFile, read as mono float32 blocks downmixed like librosa.load
+    with f:
+        blocks = (block.mean(axis=1, dtype=np.float32) for block in f.blocks(blocksize=STREAM_BLOCKSIZE, dtype='float32', always_2d=True))
+        return compute_mfcc_stream(blocks, SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=40, n_mfcc=13)
 
-    # Calculate MFCCs
-    mfcc = librosa.feature.mfcc(
-        S=log_mel_spec,  # Use pre-computed log mel spectrogram
-        n_mfcc=13
-    )
+def calculate_mfcc(audio_path, device=None):
+    audio = load_audio(audio_path, stream=device is None)
+
+    # Calculate MFCCs with the specified parameters
+    if isinstance(audio, sf.SoundFile):
+        mfcc_means = stream_mfcc(audio)
+    elif device is None:
+        mfcc_means = compute_mfcc(y=audio, sr=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=40, n_mfcc=13)
+    else:
+        mfcc_means = compute_mfcc_batch([audio], SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=40, n_mfcc=13, device=device)[0]
 
     return {
         "filename": os.path.basename(audio_path),
-        "mfcc_means": mfcc.mean(axis=1).tolist()
+        "mfcc_means": mfcc_means
     }
 
-def process_audio_files(input_path):
+def iter_batches(audio_files, stream=False):
+    # Yields lists of (file_path, audio) holding about BATCH_SECONDS of decoded audio,
+    # in the order of audio_files; audio is an open SoundFile for files load_audio streams.
+    # The next file is decoded on a background thread while the current batch is processed.
+    batch = []
+    batch_samples = 0
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        pending = prefetch.submit(load_audio, str(audio_files[0]), stream) if audio_files else None
+        for i, file_path in enumerate(audio_files):
+            audio = pending.result()
+            if i + 1 < len(audio_files):
+                pending = prefetch.submit(load_audio, str(audio_files[i + 1]), stream)
+            batch.append((file_path, audio))
+            if isinstance(audio, np.ndarray):
+                batch_samples += len(audio)
+            if batch_samples >= BATCH_SECONDS * SAMPLE_RATE:
+                yield batch
+                batch = []
+                batch_samples = 0
+    if batch:
+        yield batch
+
+def process_audio_files(input_path, device=None):
     logging.info(f"Start processing: {input_path}")
     results = []
     input_path = Path(input_path)
     
     if input_path.is_file():
         if input_path.suffix.lower() in ['.mp3', '.flac']:
-            results.append(calculate_mfcc(str(input_path)))
+            results.append(calculate_mfcc(str(input_path), device))
     else:
-        audio_files = sorted([f for f in input_path.glob('*') if f.suffix.lower() in ['.mp3', '.flac']])
-        for file_path in audio_files:
-            results.append(calculate_mfcc(str(file_path)))
+        # DirEntry caches the entry type from the directory listing, so this needs no stat() per file
+        with os.scandir(input_path) as it:
+            audio_files = sorted(Path(e.path) for e in it if e.name.lower().endswith(('.mp3', '.flac')) and e.is_file())
+        # Long files are streamed on their own instead of being decoded into the batch
+        for batch in iter_batches(audio_files, stream=device is None):
+            # One STFT for all decoded files of the batch instead of one per file
+            decoded = [(i, y) for i, (_, y) in enumerate(batch) if isinstance(y, np.ndarray)]
+            mfcc_means = compute_mfcc_batch([y for _, y in decoded], SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=40, n_mfcc=13, device=device) if decoded else []
+            means_by_position = dict(zip([i for i, _ in decoded], mfcc_means))
+            # Results in the batch's (listing) order, streamed files included
+            for i, (file_path, audio) in enumerate(batch):
+                results.append({
+                    "filename": file_path.name,
+                    "mfcc_means": means_by_position[i] if i in means_by_position else stream_mfcc(audio)
+                })
     
     logging.info(f"Processing completed. {len(results)} files processed.")
     return results
@@ -73,15 +127,21 @@ def process_audio_files(input_path):
 @click.command()
 @click.argument('input_path', type=click.Path(exists=True))
 @click.option('--output', '-o', type=click.Path(), help='Output file for JSON-Results')
-def main(input_path, output):
-    results = process_audio_files(input_path)
-    json_output = json.dumps(results, indent=2, ensure_ascii=False)
+@click.option('--device', default=None, help='Compute spectrograms with PyTorch on this device, e.g. cuda')
+def main(input_path, output, device):
+    if device is not None:
+        try:
+            import torch  # noqa: F401
+        except ImportError:
+            raise click.UsageError("--device requires PyTorch: pip install 'fmdb-audio-features[gpu]'")
+    results = process_audio_files(input_path, device)
+    json_output = to_json(results)
     
     if output:
-        with open(output, 'w', encoding='utf-8') as f:
+        with open(output, 'wb') as f:
             f.write(json_output)
     else:
-        click.echo(json_output)
+        click.echo(json_output.decode())
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Numba kernels for the reductions in the feature pipeline.
+
+The spectrogram-sized arrays are only a few rows high but very wide, so the
+kernels parallelize over rows and stream each row once. All arithmetic stays
+in the input's dtype: for the float32 pipeline that keeps twice as many values
+per SIMD register as float64 would.
+"""
+
+import sys
+
+import numba
+import numpy as np
+
+# numba caches compiled kernels next to their source files. Frozen
+# (PyInstaller) binaries ship bytecode only, where caching raises at import.
+_CACHE = not getattr(sys, "frozen", False)
+
+
+@numba.njit(parallel=True, fastmath=True, cache=_CACHE)
+def mean_rows(x):
+    """Returns the mean of each row of a 2D array (``x.mean(axis=1)``)."""
+    n_rows, n_cols = x.shape
+    out = np.zeros(n_rows, dtype=x.dtype)
+    for i in numba.prange(n_rows):
+        acc = out[i]
+        for j in range(n_cols):
+            acc += x[i, j]
+        out[i] = acc / n_cols
+    return out
+
+
+@numba.njit(parallel=True, fastmath=True, cache=_CACHE)
+def mean_db_rows(S, amin=1e-10, top_db=80.0):
+    """
+    Returns the row means of S in dB relative to its maximum.
+
+    Equivalent to ``librosa.power_to_db(S, ref=np.max, amin=amin, top_db=top_db).mean(axis=1)``,
+    but without writing the dB values. With the maximum as reference the peak
+    maps to 0 dB, so the top_db threshold is known up front.
+
+    Fuses the dB conversion, the top_db clipping and the row mean: after the
+    pass that finds the maximum, each value is converted and summed in
+    registers, so S is read twice and nothing of its size is written.
+    """
+    n_rows, n_cols = S.shape
+    out = np.zeros(n_rows, dtype=S.dtype)
+    if n_cols == 0:
+        return out
+    # Constants in the dtype of S, so float32 input is not promoted to float64
+    consts = np.array([amin, -top_db, 10.0]).astype(S.dtype)
+    amin_, floor, ten = consts[0], consts[1], consts[2]
+
+    row_max = np.empty(n_rows, dtype=S.dtype)
+    for i in numba.prange(n_rows):
+        m = S[i, 0]
+        for j in range(1, n_cols):
+            if S[i, j] > m:
+                m = S[i, j]
+        row_max[i] = m
+    log_ref = ten * np.log10(max(amin_, row_max.max()))
+
+    for i in numba.prange(n_rows):
+        acc = out[i]
+        for j in range(n_cols):
+            acc += max(ten * np.log10(max(amin_, S[i, j])) - log_ref, floor)
+        out[i] = acc / n_cols
+    return out
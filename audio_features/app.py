@@ -1,20 +1,38 @@
 import os
 import librosa
+import numba
 import numpy as np
+import soundfile as sf
 import logging
+import sys
 import json
 import hashlib
+import mmap
+import multiprocessing
+import contextlib
+import heapq
 from pathlib import Path
-from typing import Dict, List, Union, Optional, Any
+from typing import Dict, List, Union, Optional, Any, Tuple, BinaryIO
 import typer
 from mutagen.mp3 import MP3
 from mutagen.flac import FLAC
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import time
 from tqdm import tqdm
-import pickle
+from audio_features._kernels import mean_rows
+from audio_features.core import JsonArrayWriter, compute_mfcc, mel_basis, to_json, to_json_line
 import tempfile
+import scipy.fft
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
 
 BUILD_ID = os.getenv('BUILD_ID', 'development')
 
@@ -24,12 +42,54 @@ logger.addHandler(logging.StreamHandler())
 logger.setLevel(logging.WARNING)
 
 app = typer.Typer()
-thread_local = threading.local()
+
+# Metadata field -> tag key, per container: ID3 frames for MP3, Vorbis comments for FLAC
+_MP3_TAG_MAP = {"title": "TIT2", "artist": "TPE1", "album": "TALB", "year": "TDRC", "genre": "TCON", "isrc": "TSRC"}
+_FLAC_TAG_MAP = {"title": "title", "artist": "artist", "album": "album", "year": "date", "genre": "genre", "isrc": "isrc"}
+_TAG_READERS = {'.mp3': (MP3, _MP3_TAG_MAP), '.flac': (FLAC, _FLAC_TAG_MAP)}
+
+# librosa runs its FFTs through scipy.fft, so an installed pyFFTW can be plugged
+# in as the global backend. The interface cache keeps the FFTW plans alive, so
+# each transform shape is planned once per process instead of once per file.
+if pyfftw is not None:
+    pyfftw.interfaces.cache.enable()
+    scipy.fft.set_global_backend(pyfftw.interfaces.scipy_fft)
+
+def _load_audio(audio_path: str, fileobj: Optional[BinaryIO] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decodes an audio file to a mono float32 signal at its native sample rate.
+    
+    Reads through soundfile directly (from fileobj if given) and averages the
+    channels, skipping the extra checks in librosa.load. 16-bit PCM files are
+    decoded as int16, half the size of float32, and scaled while downmixing;
+    this gives exactly the samples a float32 read would. librosa.load is only
+    used for files that libsndfile cannot decode (e.g. MP3 with libsndfile < 1.1).
+    """
+    try:
+        with sf.SoundFile(fileobj if fileobj is not None else audio_path) as f:
+            if f.subtype == 'PCM_16':
+                data = f.read(dtype='int16', always_2d=True)
+                y = data.mean(axis=1, dtype=np.float32)
+                y *= np.float32(1 / 32768)
+            else:
+                data = f.read(dtype='float32')
+                y = data if data.ndim == 1 else data.mean(axis=1, dtype=np.float32)
+            sr = f.samplerate
+    except sf.SoundFileRuntimeError:
+        y, sr = librosa.load(audio_path, sr=None, mono=True, dtype=np.float32)
+    return y, int(sr)
+
+def _tag_source(audio_path: str, buffer: Optional[mmap.mmap] = None) -> contextlib.AbstractContextManager:
+    """Returns a file object for mutagen: the mapping rewound to the start if given, else a buffered open."""
+    if buffer is None:
+        return open(audio_path, 'rb', buffering=65536)
+    buffer.seek(0)
+    return contextlib.nullcontext(buffer)
 
 class AudioProcessor:
     """Main class for audio file processing."""
     
-    def __init__(self, cache_dir: Optional[Path] = None, use_cache: bool = True):
+    def __init__(self, cache_dir: Optional[Path] = None, use_cache: bool = True) -> None:
         """
         Initializes the AudioProcessor.
         
@@ -37,151 +97,202 @@ class AudioProcessor:
             cache_dir: Directory for feature cache
             use_cache: Whether to use caching
         """
-        self.use_cache = use_cache
-        self.cache_dir = cache_dir or Path(tempfile.gettempdir()) / "fmdb_audio_features_cache"
+        self.use_cache: bool = use_cache
+        self._hash_cache: Dict[Tuple[str, int, int], str] = {}
+        self._cache_key_cache: Dict[Tuple[str, int, int], str] = {}
+        self.cache_dir: Path = cache_dir or Path(tempfile.gettempdir()) / "fmdb_audio_features_cache"
         if self.use_cache and not self.cache_dir.exists():
             self.cache_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"Cache directory created: {self.cache_dir}")
     
-    def calculate_sha256(self, file_path: str) -> str:
-        """Calculates the SHA256 hash of a file."""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+    def calculate_sha256(self, file_path: str, buffer: Optional[mmap.mmap] = None, st: Optional[os.stat_result] = None) -> str:
+        """
+        Calculates the SHA256 hash of a file.
+        
+        Hashes are memoized by path, modification time and size, so repeated
+        calls for an unchanged file do not read it again. If the file is
+        already mapped into memory, the mapping can be passed as buffer and is
+        hashed instead of reading the file. st is the file's stat result if
+        the caller already has it.
+        """
+        st = st or os.stat(file_path)
+        key = (file_path, st.st_mtime_ns, st.st_size)
+        file_hash = self._hash_cache.get(key)
+        if file_hash is None:
+            if buffer is not None:
+                file_hash = hashlib.sha256(buffer).hexdigest()
+            else:
+                with open(file_path, "rb") as f:
+                    file_hash = hashlib.file_digest(f, "sha256").hexdigest()
+            self._hash_cache[key] = file_hash
+        return file_hash
+    
+    def calculate_cache_key(self, file_path: str, st: Optional[os.stat_result] = None) -> str:
+        """
+        Calculates the content hash that names a file's cache entry.
+        
+        Uses BLAKE3 if the optional blake3 package is installed, which hashes
+        several times faster than SHA256 and makes cache hits cheaper, as a
+        hit needs no other hash. Otherwise the key is the SHA256 of the file.
+        Memoized like calculate_sha256.
+        """
+        if blake3 is None:
+            return self.calculate_sha256(file_path, st=st)
+        st = st or os.stat(file_path)
+        key = (file_path, st.st_mtime_ns, st.st_size)
+        cache_key = self._cache_key_cache.get(key)
+        if cache_key is None:
+            cache_key = blake3.blake3().update_mmap(file_path).hexdigest()
+            self._cache_key_cache[key] = cache_key
+        return cache_key
     
     def get_cache_path(self, audio_path: str, file_hash: str) -> Path:
         """Determines the path for the cache file."""
-        return self.cache_dir / f"{file_hash}.pickle"
+        return self.cache_dir / f"{file_hash}.npz"
     
-    def extract_metadata(self, audio_path: str, file_number: int) -> Dict:
-        """Extracts metadata from an audio file."""
+    def extract_metadata(self, audio_path: str, file_number: int, buffer: Optional[mmap.mmap] = None, st: Optional[os.stat_result] = None) -> Dict[str, Any]:
+        """Extracts metadata from an audio file, hashing and parsing buffer if the file is already mapped."""
         file_path = Path(audio_path)
-        file_size = file_path.stat().st_size / (1024 * 1024)
-        file_hash = self.calculate_sha256(audio_path)
+        st = st or os.stat(audio_path)
+        file_size = st.st_size / (1024 * 1024)
+        file_hash = self.calculate_sha256(audio_path, buffer, st)
+        
+        suffix = file_path.suffix.lower()
         
-        metadata = {
+        metadata: Dict[str, Any] = {
             "filename": file_path.name,
             "file_number": file_number,
             "file_size_in_mb": round(file_size, 2),
-            "lossless": file_path.suffix.lower() == '.flac',
+            "lossless": suffix == '.flac',
             "sha256": file_hash,
             "build_id": BUILD_ID
         }
         
-        if file_path.suffix.lower() == '.mp3':
-            mp3 = MP3(audio_path)
-            metadata.update({
-                "title": mp3.tags.get('TIT2', [''])[0] if mp3.tags else '',
-                "artist": mp3.tags.get('TPE1', [''])[0] if mp3.tags else '',
-                "album": mp3.tags.get('TALB', [''])[0] if mp3.tags else '',
-                "year": mp3.tags.get('TDRC', [''])[0] if mp3.tags else '',
-                "genre": mp3.tags.get('TCON', [''])[0] if mp3.tags else '',
-                "isrc": mp3.tags.get('TSRC', [''])[0] if mp3.tags and 'TSRC' in mp3.tags else '',
-                "duration_in_ms": int(mp3.info.length * 1000),
-                "bitrate": int(mp3.info.bitrate / 1000),
-                "sample_rate": mp3.info.sample_rate,
-                "channels": "Stereo" if mp3.info.channels == 2 else "Mono"
-            })
-        elif file_path.suffix.lower() == '.flac':
-            flac = FLAC(audio_path)
+        if suffix in _TAG_READERS:
+            reader, tag_map = _TAG_READERS[suffix]
+            with _tag_source(audio_path, buffer) as fh:
+                audio = reader(fileobj=fh)
+            tags = audio.tags or {}
+            info = audio.info
+            metadata.update({field: tags.get(key, [''])[0] for field, key in tag_map.items()})
             metadata.update({
-                "title": flac.tags.get('title', [''])[0] if flac.tags else '',
-                "artist": flac.tags.get('artist', [''])[0] if flac.tags else '',
-                "album": flac.tags.get('album', [''])[0] if flac.tags else '',
-                "year": flac.tags.get('date', [''])[0] if flac.tags else '',
-                "genre": flac.tags.get('genre', [''])[0] if flac.tags else '',
-                "isrc": flac.tags.get('isrc', [''])[0] if flac.tags and 'isrc' in flac.tags else '',
-                "duration_in_ms": int(flac.info.length * 1000),
-                "bitrate": int(flac.info.bitrate / 1000),
-                "sample_rate": flac.info.sample_rate,
-                "channels": "Stereo" if flac.info.channels == 2 else "Mono"
+                "duration_in_ms": int(info.length * 1000),
+                "bitrate": int(info.bitrate / 1000),
+                "sample_rate": info.sample_rate,
+                "channels": "Stereo" if info.channels == 2 else "Mono"
             })
         
         return metadata
     
-    def check_cache(self, audio_path: str) -> Optional[Dict]:
+    def check_cache(self, audio_path: str, st: Optional[os.stat_result] = None) -> Optional[Dict[str, Any]]:
         """Checks if a cache file exists and returns the features if available."""
         if not self.use_cache:
             return None
             
-        file_hash = self.calculate_sha256(audio_path)
+        file_hash = self.calculate_cache_key(audio_path, st)
         cache_path = self.get_cache_path(audio_path, file_hash)
         
         if cache_path.exists():
             try:
-                with open(cache_path, 'rb') as f:
-                    cached_data = pickle.load(f)
-                if cached_data.get('build_id') == BUILD_ID:
+                with np.load(cache_path, allow_pickle=False) as cached:
+                    metadata = json.loads(cached['metadata'].item())
+                    features = {
+                        name: cached[name].item() if cached[name].ndim == 0 else cached[name]
+                        for name in cached.files if name != 'metadata'
+                    }
+                if metadata.get('build_id') == BUILD_ID:
                     logger.info(f"Cache hit for {audio_path}")
-                    return cached_data
+                    return {"metadata": metadata, "features": features}
             except Exception as e:
                 logger.warning(f"Error reading cache file {cache_path}: {e}")
         
         return None
     
-    def save_to_cache(self, audio_path: str, result: Dict) -> None:
-        """Saves results to cache."""
+    def save_to_cache(self, audio_path: str, result: Dict[str, Any], st: Optional[os.stat_result] = None) -> None:
+        """
+        Saves results to cache.
+        
+        Features are stored as arrays in an .npz file, with the metadata
+        serialized as JSON alongside them.
+        """
         if not self.use_cache:
             return
             
-        file_hash = self.calculate_sha256(audio_path)
+        file_hash = self.calculate_cache_key(audio_path, st)
         cache_path = self.get_cache_path(audio_path, file_hash)
         
         try:
+            features = {name: np.asarray(value) for name, value in result['features'].items()}
             with open(cache_path, 'wb') as f:
-                pickle.dump(result, f)
+                np.savez(f, metadata=np.array(json.dumps(result['metadata'], default=str)), **features)
             logger.info(f"Cache saved for {audio_path}")
         except Exception as e:
             logger.warning(f"Error saving cache file {cache_path}: {e}")
     
-    def calculate_audio_features(self, audio_path: str, file_number: int) -> Dict:
+    def calculate_audio_features(self, audio_path: str, file_number: int, st: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
         Calculates various audio features including MFCC, spectral contrast,
         chroma, and tempo.
+        
+        st is the file's stat result if the caller already has it, e.g. from
+        the directory listing. The file is stat'ed at most once either way.
         """
         logger.info(f"Processing file: {audio_path}")
+        st = st or os.stat(audio_path)
         
         # Check if in cache
-        cached_result = self.check_cache(audio_path)
+        cached_result = self.check_cache(audio_path, st)
         if cached_result:
-            cached_result['metadata']['file_number'] = file_number  # Update file number
+            # The cache is keyed by content, so identical files under different
+            # names share an entry; fields that depend on the path are this file's
+            file_path = Path(audio_path)
+            cached_result['metadata'].update({
+                "filename": file_path.name,
+                "file_number": file_number,
+                "lossless": file_path.suffix.lower() == '.flac'
+            })
             return cached_result
         
-        # Extract metadata
-        metadata = self.extract_metadata(audio_path, file_number)
+        # Decode on a helper thread while this one hashes the file and parses
+        # its tags for the metadata. hashlib and libsndfile both release the
+        # GIL, so the SHA256 overlaps with decoding when it has not been
+        # computed yet: with --no-cache, or when the cache key is BLAKE3.
+        # With the default SHA256 cache key, check_cache above has already
+        # hashed the file, as the key is needed before deciding to decode.
+        # The decoder gets a second mapping of the same file only for its own
+        # file position: both map the same page cache pages, so the file is
+        # still read from disk once.
+        with (
+            open(audio_path, 'rb') as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as decoder_view,
+            ThreadPoolExecutor(max_workers=1) as decoder
+        ):
+            audio_future = decoder.submit(_load_audio, audio_path, decoder_view)
+            # Extract metadata
+            metadata = self.extract_metadata(audio_path, file_number, mm, st)
         
         try:
             # Load audio
-            y, sr = librosa.load(audio_path, sr=None)
+            y, sr = audio_future.result()
             logger.info(f"Sample rate: {sr} Hz")
             
-            # Calculate Mel spectrogram
-            mel_spec = librosa.feature.melspectrogram(
-                y=y,
-                sr=sr,
+            # Magnitude spectrogram shared by all spectral features
+            S = np.abs(librosa.stft(
+                y,
                 n_fft=2048,
                 win_length=2048,
                 hop_length=512,
-                window='hann',
-                n_mels=40,
-                fmin=0.0,
-                fmax=sr/2,
-                power=2.0
-            )
-            
-            log_mel_spec = librosa.power_to_db(mel_spec, ref=np.max)
+                window='hann'
+            ))
+            S_power = S**2
             
             # Calculate MFCC
-            mfcc = librosa.feature.mfcc(
-                S=log_mel_spec,
-                n_mfcc=13
-            )
+            mfcc = compute_mfcc(S=S_power, sr=sr, n_fft=2048, hop_length=512)
             
-            # Spectral contrast
+            # Spectral contrast (librosa computes it in float64)
             spectral_contrast = librosa.feature.spectral_contrast(
-                y=y, 
+                S=S,
                 sr=sr,
                 n_fft=2048,
                 hop_length=512
@@ -189,28 +300,39 @@ class AudioProcessor:
             
             # Chroma
             chroma = librosa.feature.chroma_stft(
-                y=y, 
+                S=S_power,
                 sr=sr,
                 n_fft=2048,
                 hop_length=512
             )
             
-            # Tempo
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+            # Tempo, from the onset envelope beat_track would compute: median
+            # aggregation over the default 128-band Mel spectrogram
+            onset_env = librosa.onset.onset_strength(
+                S=librosa.power_to_db(mel_basis(sr, 2048, 128) @ S_power),
+                sr=sr,
+                hop_length=512,
+                aggregate=np.median
+            )
+            # Only the tempo is used, so skip beat_track's beat-level dynamic programming
+            if onset_env.any():
+                tempo = librosa.feature.tempo(onset_envelope=onset_env, sr=sr, hop_length=512)[0]
+            else:
+                tempo = 0.0
             
             # Assemble result
             result = {
                 "metadata": metadata,
                 "features": {
-                    "mfcc": mfcc.mean(axis=1).tolist(),
-                    "spectral_contrast": spectral_contrast.mean(axis=1).tolist(),
-                    "chroma": chroma.mean(axis=1).tolist(),
+                    "mfcc": mfcc,
+                    "spectral_contrast": mean_rows(spectral_contrast.astype(np.float32, copy=False)),
+                    "chroma": mean_rows(chroma),
                     "tempo": float(tempo)
                 }
             }
             
             # Save to cache
-            self.save_to_cache(audio_path, result)
+            self.save_to_cache(audio_path, result, st)
             
             return result
             
@@ -219,7 +341,7 @@ class AudioProcessor:
             # Ensure that at least metadata is returned
             return {"metadata": metadata, "error": str(e)}
     
-    def process_audio_files(self, input_path: Union[str, Path], output: Optional[Path] = None, verbose: bool = False) -> List[Dict]:
+    def process_audio_files(self, input_path: Union[str, Path], output: Optional[Path] = None, verbose: bool = False, pretty: bool = False) -> List[Dict[str, Any]]:
         """
         Processes a single audio file or all audio files in a directory.
         
@@ -227,6 +349,7 @@ class AudioProcessor:
             input_path: Path to audio file or directory
             output: Optional output path for JSON results
             verbose: Whether to display verbose output
+            pretty: Whether results displayed in verbose mode are indented instead of one line each
             
         Returns:
             List of processing results
@@ -237,54 +360,89 @@ class AudioProcessor:
         if not input_path.exists():
             raise typer.BadParameter(f"Input path {input_path} does not exist")
 
-        # Lock for thread-safe result storage
-        results_lock = threading.Lock()
-        results = []
-        errors = []
-
-        def process_file(args: tuple) -> Optional[Dict]:
-            file_path, file_number = args
-            try:
-                result = self.calculate_audio_features(str(file_path), file_number)
-                if result:
-                    with results_lock:
-                        if "error" in result:
-                            errors.append((file_path, result["error"]))
-                        else:
-                            results.append(result)
-                    if not output:
-                        if verbose:
-                            # Display JSON output when in verbose mode and no output file is specified
-                            print(json.dumps(result, indent=2))
-                        else:
-                            logger.info(f"Processing successful: {file_path}")
-                return result
-            except Exception as e:
-                error_msg = f"Error processing {file_path}: {str(e)}"
-                logger.error(error_msg)
-                with results_lock:
-                    errors.append((file_path, str(e)))
-                return None
+        results: List[Dict[str, Any]] = []
+        errors: List[Tuple[str, str]] = []
 
         if input_path.is_file():
-            files = [(input_path, 1)]
+            files = [(str(input_path), 1, input_path.stat())]
         else:
-            files = [(f, i+1) for i, f in enumerate(sorted([f for f in input_path.glob('*') if f.suffix.lower() in ['.mp3', '.flac']]))]
+            # DirEntry caches the entry type from the directory listing, and its
+            # stat() result (free on Windows) is passed to the workers, which
+            # then need no further stat() for the size and the hash cache key
+            with os.scandir(input_path) as it:
+                audio_files = sorted(
+                    (e.path, e.stat()) for e in it if e.name.lower().endswith(('.mp3', '.flac')) and e.is_file()
+                )
+            files = [(f, i+1, st) for i, (f, st) in enumerate(audio_files)]
+
+        if not files:
+            logger.warning(f"No MP3 or FLAC files found in {input_path}")
+            return results
 
         max_workers = min(os.cpu_count() or 4, len(files))
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Progress display with tqdm
-            futures = [executor.submit(process_file, args) for args in files]
+        with contextlib.ExitStack() as stack:
+            # Spawn fresh workers on every platform: forking a process that has
+            # already started numba/BLAS threads is unsafe (notably on macOS)
+            executor = stack.enter_context(ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(self.use_cache, self.cache_dir, logger.level)
+            ))
+
+            # Results are written to the output file as they arrive instead of all
+            # at the end; it is only opened once the pool exists, so a failed
+            # startup leaves no truncated file behind
+            writer: Optional[JsonArrayWriter] = None
+            if output:
+                f = stack.enter_context(open(output, 'wb', buffering=1 << 20))
+                writer = stack.enter_context(JsonArrayWriter(f))
+            # Hand files to the workers in chunks to cut the per-file IPC round-trips;
+            # map yields the results in submission order
+            chunksize = max(1, len(files) // (4 * max_workers))
+            # Submit the largest files first, spread over the chunks, so no big
+            # file starts last and no worker gets several of them back to back;
+            # file numbers stay alphabetical
+            submitted = _deal_by_size(files, chunksize)
+            file_paths = [file_path for file_path, _, _ in submitted]
+            file_numbers = [file_number for _, file_number, _ in submitted]
+            stats = [st for _, _, st in submitted]
+            processed = executor.map(process_file, file_paths, file_numbers, stats, chunksize=chunksize)
             
-            with tqdm(total=len(files), desc="Processing audio files") as pbar:
-                for future in as_completed(futures):
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logger.error(f"Unexpected error in thread: {str(e)}")
-                    finally:
-                        pbar.update(1)
+            # Results are held back until all files with lower numbers are done,
+            # so they are still written and displayed in file_number order
+            pending: List[Tuple[int, str, Dict[str, Any]]] = []
+            next_number = 1
+            
+            # Progress display with tqdm; it comes first in zip, which stops at the
+            # first exhausted iterator, so the bar's final update is not skipped
+            for result, file_number, file_path in zip(tqdm(processed, total=len(files), desc="Processing audio files"), file_numbers, file_paths):
+                heapq.heappush(pending, (file_number, file_path, result))
+                while pending and pending[0][0] == next_number:
+                    _, file_path, result = heapq.heappop(pending)
+                    next_number += 1
+                    if "error" in result:
+                        errors.append((file_path, result["error"]))
+                    else:
+                        results.append(result)
+                        if writer:
+                            writer.write(result)
+                    if not output:
+                        if verbose:
+                            # Display JSON output when in verbose mode and no output file is specified,
+                            # by default as one line per result (NDJSON)
+                            if pretty:
+                                print(to_json(result).decode())
+                            else:
+                                # Written below the text layer: flush any text it still holds
+                                # first, and show each line right away on a terminal
+                                sys.stdout.flush()
+                                sys.stdout.buffer.write(to_json_line(result))
+                                if sys.stdout.isatty():
+                                    sys.stdout.buffer.flush()
+                        else:
+                            logger.info(f"Processing successful: {file_path}")
 
         # Show error summary
         if errors:
@@ -294,23 +452,70 @@ class AudioProcessor:
 
         logger.info(f"Processing completed. {len(results)} files successfully processed.")
 
-        # Sort results by file_number
-        results.sort(key=lambda x: x['metadata']['file_number'])
-
         if output:
-            with open(output, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
-                logger.info(f"Results saved to: {output}")
+            logger.info(f"Results saved to: {output}")
 
         return results
 
+def _deal_by_size(files: List[Tuple[str, int, os.stat_result]], chunksize: int) -> List[Tuple[str, int, os.stat_result]]:
+    """
+    Orders files for executor.map so the largest are submitted first but land in different chunks.
+    
+    The files are sorted by size, largest first, and dealt round-robin onto
+    the chunks map will cut (all of chunksize files, except possibly the
+    last): the first chunk gets the largest file, the second chunk the second
+    largest, and so on, then the next round starts again at the first chunk.
+    """
+    by_size = iter(sorted(files, key=lambda item: item[2].st_size, reverse=True))
+    n_full, remainder = divmod(len(files), chunksize)
+    chunks: List[List[Tuple[str, int, os.stat_result]]] = [[] for _ in range(n_full + (remainder > 0))]
+    for row in range(chunksize):
+        for i, chunk in enumerate(chunks):
+            if i < n_full or row < remainder:
+                chunk.append(next(by_size))
+    return [item for chunk in chunks for item in chunk]
+
+# AudioProcessor of the current worker process, set up by init_worker
+_worker_processor: Optional[AudioProcessor] = None
+
+def init_worker(use_cache: bool, cache_dir: Path, log_level: int = logging.WARNING) -> None:
+    """
+    Prepares a worker process before it receives its first file.
+    
+    Creates the processor shared by all files of this worker and runs the MFCC
+    pipeline once on silence, so librosa's lazy imports, the numba kernels and
+    the Mel filter bank for 44.1 kHz are ready when real work arrives.
+    """
+    global _worker_processor
+    # Spawned workers start with a fresh logger
+    logger.setLevel(log_level)
+    _worker_processor = AudioProcessor(cache_dir=cache_dir, use_cache=use_cache)
+    # The pool already runs one worker per core; keep numba from adding threads on top
+    numba.set_num_threads(1)
+    compute_mfcc(y=np.zeros(4096, dtype=np.float32), sr=44100)
+
+def process_file(file_path: str, file_number: int, st: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """
+    Calculates the features of a single file inside a worker process.
+
+    Defined at module level so it can be pickled by the ProcessPoolExecutor.
+    Errors are returned as results, so one failing file does not abort the
+    ordered result stream of executor.map.
+    """
+    try:
+        return _worker_processor.calculate_audio_features(file_path, file_number, st)
+    except Exception as e:
+        logger.error(f"Error processing {file_path}: {str(e)}")
+        return {"error": str(e)}
+
 @app.command()
 def main(
     input_path: Path = typer.Argument(..., exists=True, help="Input audio file or directory"),
     output: Optional[Path] = typer.Option(None, "--output", "-o", help="Output file for JSON results"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging"),
     no_cache: bool = typer.Option(False, "--no-cache", help="Disable feature cache usage"),
-    cache_dir: Optional[Path] = typer.Option(None, "--cache-dir", help="Directory for feature cache")
+    cache_dir: Optional[Path] = typer.Option(None, "--cache-dir", help="Directory for feature cache"),
+    pretty: bool = typer.Option(False, "--pretty", help="Indent the JSON results displayed in verbose mode")
 ):
     """
     FMDB Audio Features: Extracts audio features from MP3 or FLAC files.
@@ -322,7 +527,7 @@ def main(
     # Configure logging
     if verbose:
         logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(threadName)s - %(levelname)s - %(message)s')
+        formatter = logging.Formatter('%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
         for handler in logger.handlers:
             handler.setFormatter(formatter)
     
@@ -332,7 +537,7 @@ def main(
     try:
         # Start processing
         start_time = time.time()
-        results = processor.process_audio_files(input_path, output, verbose)
+        results = processor.process_audio_files(input_path, output, verbose, pretty)
         elapsed_time = time.time() - start_time
         
         # Show summary
@@ -340,7 +545,7 @@ def main(
         print(f"Processed files: {len(results)}")
         print(f"Duration: {elapsed_time:.2f} seconds")
         
-        if output:
+        if output and results:
             print(f"Results saved to: {output}")
         
         return results
@@ -349,4 +554,6 @@ def main(
         raise typer.Exit(code=1)
 
 if __name__ == "__main__":
+    # Needed for the process pool in frozen (PyInstaller) binaries
+    multiprocessing.freeze_support()
     app() 
\ No newline at end of file
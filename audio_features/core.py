@@ -0,0 +1,279 @@
+"""Feature computations shared by the command line tools.
+
+Both the full feature extractor (audio_features.app) and the Essentia-aligned
+MFCC tool (app.py) compute their MFCCs here, so librosa and the numba kernels
+are imported and warmed up through a single code path.
+"""
+
+import functools
+from typing import Any, BinaryIO, Iterable, List, Optional, Sequence, Tuple
+
+import librosa
+import numpy as np
+import orjson
+import scipy.fft
+
+from audio_features._kernels import mean_db_rows
+
+
+@functools.lru_cache(maxsize=8)
+def mel_basis(sr: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """Returns the Mel filter bank for the given parameters, built once per process."""
+    return librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels, fmin=0.0, fmax=sr/2)
+
+
+@functools.lru_cache(maxsize=8)
+def dct_basis(n_mels: int, n_mfcc: int) -> np.ndarray:
+    """Returns the orthonormal DCT-II matrix that librosa.feature.mfcc applies to the Mel bands."""
+    return scipy.fft.dct(np.eye(n_mels, dtype=np.float32), type=2, norm='ortho', axis=0)[:n_mfcc]
+
+
+def compute_mfcc(
+    y: Optional[np.ndarray] = None,
+    sr: int = 22050,
+    S: Optional[np.ndarray] = None,
+    n_fft: int = 2048,
+    hop_length: int = 512,
+    n_mels: int = 40,
+    n_mfcc: int = 13
+) -> np.ndarray:
+    """
+    Calculates the mean of each MFCC over all frames.
+
+    Args:
+        y: Mono audio signal
+        sr: Sample rate of y
+        S: Precomputed power spectrogram (|STFT|^2), used instead of y
+        n_fft: FFT size (and window size, Hann window)
+        hop_length: Hop length between frames
+        n_mels: Number of Mel bands (0 Hz to Nyquist)
+        n_mfcc: Number of MFCCs
+
+    Returns:
+        Array of n_mfcc mean coefficients
+    """
+    if S is None:
+        # The zero padding librosa.stft(center=True) adds around the signal
+        pad = n_fft // 2
+        mel_spec = _mel_spectrogram(np.pad(y.astype(np.float32, copy=False), pad), sr, n_fft, hop_length, n_mels)
+    else:
+        mel_spec = mel_basis(sr, n_fft, n_mels) @ S
+    return _mfcc_means(mel_spec, n_mfcc)
+
+
+def compute_mfcc_batch(
+    signals: Sequence[np.ndarray],
+    sr: int,
+    n_fft: int = 2048,
+    hop_length: int = 512,
+    n_mels: int = 40,
+    n_mfcc: int = 13,
+    device: Optional[str] = None
+) -> List[np.ndarray]:
+    """
+    Calculates the mean MFCCs of several signals with a single STFT.
+
+    Each signal is placed in one long buffer with the zero padding that
+    librosa.stft(center=True) would add around it, starting at a multiple of
+    hop_length. Every frame of the long transform therefore equals the
+    corresponding frame of a per-signal transform, and the frames are split
+    back per signal before the dB conversion, which is relative to each
+    signal's own maximum.
+
+    With a device (e.g. "cuda"), the STFT and all reductions run in PyTorch
+    on that device, using the same Mel filter bank and DCT matrix as the
+    librosa path. This requires the optional torch dependency.
+
+    Args:
+        signals: Mono audio signals, all at sample rate sr
+        sr: Sample rate of the signals
+        n_fft, hop_length, n_mels, n_mfcc: As in compute_mfcc
+        device: Torch device to compute on; None computes with librosa on the CPU
+
+    Returns:
+        One array of n_mfcc mean coefficients per signal
+    """
+    pad = n_fft // 2
+    offsets = []
+    total = 0
+    for y in signals:
+        n_frames = 1 + len(y) // hop_length
+        offsets.append((total, n_frames))
+        # Room for the padded signal and its last frame, rounded up to the next hop
+        length = max((n_frames - 1) * hop_length + n_fft, len(y) + pad)
+        total += -(-length // hop_length) * hop_length
+
+    buffer = np.zeros(total + n_fft, dtype=np.float32)
+    for y, (start, _) in zip(signals, offsets):
+        buffer[start + pad:start + pad + len(y)] = y
+    frames = [(start // hop_length, start // hop_length + n_frames) for start, n_frames in offsets]
+
+    if device is not None:
+        return _mfcc_means_torch(buffer, frames, sr, n_fft, hop_length, n_mels, n_mfcc, device)
+
+    mel_spec = _mel_spectrogram(buffer, sr, n_fft, hop_length, n_mels)
+    return [_mfcc_means(mel_spec[:, first:last], n_mfcc) for first, last in frames]
+
+
+def compute_mfcc_stream(
+    blocks: Iterable[np.ndarray],
+    sr: int,
+    n_fft: int = 2048,
+    hop_length: int = 512,
+    n_mels: int = 40,
+    n_mfcc: int = 13
+) -> np.ndarray:
+    """
+    Calculates the mean MFCCs of a signal given as consecutive blocks.
+
+    Equivalent to compute_mfcc on the concatenated blocks, but only one block
+    of samples is held at a time: each block is reduced to its Mel frames
+    right away, and the samples of frames that reach into the next block are
+    carried over. Only the n_mels x T Mel spectrogram is kept for the dB
+    conversion, which needs the global maximum.
+
+    Args:
+        blocks: Consecutive mono float32 blocks of the signal, of any length
+        sr, n_fft, hop_length, n_mels, n_mfcc: As in compute_mfcc
+
+    Returns:
+        Array of n_mfcc mean coefficients
+    """
+    # Start with the zero padding librosa.stft(center=True) adds before the signal
+    pad = n_fft // 2
+    carry = np.zeros(pad, dtype=np.float32)
+    mel_blocks = []
+    for block in blocks:
+        buffer = np.concatenate([carry, block.astype(np.float32, copy=False)])
+        n_frames = 1 + (len(buffer) - n_fft) // hop_length if len(buffer) >= n_fft else 0
+        if n_frames:
+            mel_blocks.append(_mel_spectrogram(buffer[:(n_frames - 1) * hop_length + n_fft], sr, n_fft, hop_length, n_mels))
+        carry = buffer[n_frames * hop_length:]
+    # The remaining frames, with the padding after the signal
+    mel_blocks.append(_mel_spectrogram(np.concatenate([carry, np.zeros(pad, dtype=np.float32)]), sr, n_fft, hop_length, n_mels))
+    return _mfcc_means(np.concatenate(mel_blocks, axis=1), n_mfcc)
+
+
+def _mel_spectrogram(
+    y: np.ndarray,
+    sr: int,
+    n_fft: int,
+    hop_length: int,
+    n_mels: int,
+    block_frames: int = 1024
+) -> np.ndarray:
+    """
+    Computes the Mel power spectrogram of an already padded signal (center=False framing).
+
+    The STFT is computed block_frames frames at a time and each block is
+    reduced to its Mel bands right away, so the full (1 + n_fft/2) x T
+    spectrogram is never held in memory, only the n_mels x T result.
+    """
+    basis = mel_basis(sr, n_fft, n_mels)
+    n_frames = 1 + (len(y) - n_fft) // hop_length
+    mel_spec = np.empty((n_mels, n_frames), dtype=np.float32)
+    for first in range(0, n_frames, block_frames):
+        last = min(first + block_frames, n_frames)
+        S = np.abs(librosa.stft(
+            y[first * hop_length:(last - 1) * hop_length + n_fft],
+            n_fft=n_fft,
+            win_length=n_fft,
+            hop_length=hop_length,
+            window='hann',
+            center=False
+        ))**2
+        np.matmul(basis, S, out=mel_spec[:, first:last])
+    return mel_spec
+
+
+def _mfcc_means(mel_spec: np.ndarray, n_mfcc: int) -> np.ndarray:
+    """Returns the mean of each MFCC of a Mel power spectrogram."""
+    # The DCT is linear, so the mean MFCC is the DCT of the mean log-Mel frame.
+    # This is librosa.feature.mfcc without the per-frame DCT and the n_mfcc x T array,
+    # and the dB values are averaged without being stored.
+    return dct_basis(mel_spec.shape[0], n_mfcc) @ mean_db_rows(mel_spec)
+
+
+def _mfcc_means_torch(
+    buffer: np.ndarray,
+    frames: Sequence[Tuple[int, int]],
+    sr: int,
+    n_fft: int,
+    hop_length: int,
+    n_mels: int,
+    n_mfcc: int,
+    device: str,
+    amin: float = 1e-10,
+    top_db: float = 80.0
+) -> List[np.ndarray]:
+    """PyTorch version of the compute_mfcc_batch pipeline for a prepared buffer."""
+    import torch
+
+    x = torch.from_numpy(buffer).to(device, non_blocking=True)
+    window = torch.hann_window(n_fft, device=device)
+    S = torch.stft(
+        x,
+        n_fft=n_fft,
+        hop_length=hop_length,
+        win_length=n_fft,
+        window=window,
+        center=False,
+        return_complex=True
+    ).abs().pow_(2)
+    mel_spec = torch.from_numpy(mel_basis(sr, n_fft, n_mels)).to(device) @ S
+    dct = torch.from_numpy(dct_basis(n_mels, n_mfcc)).to(device)
+
+    means = []
+    for first, last in frames:
+        log_mel_spec = 10.0 * torch.log10(torch.clamp(mel_spec[:, first:last], min=amin))
+        log_mel_spec = torch.clamp(log_mel_spec - log_mel_spec.max(), min=-top_db)
+        # The DCT is linear, so the mean MFCC is the DCT of the mean log-Mel frame
+        means.append(dct @ log_mel_spec.mean(dim=1))
+    return list(torch.stack(means).cpu().numpy())
+
+
+def to_json(obj: Any) -> bytes:
+    """
+    Serializes results as indented UTF-8 JSON.
+
+    NumPy arrays are written directly. Other values orjson does not know, such
+    as mutagen's ID3 timestamps, are written as strings.
+    """
+    return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def to_json_line(obj: Any) -> bytes:
+    """Serializes a result as one compact line of JSON, for newline-delimited output."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array to a binary file one element at a time.
+
+    The output is byte for byte what to_json would produce for the whole list,
+    but no element has to wait for the others to be serialized, and the
+    complete document is never held in memory. The array is only closed if
+    the with block completes without an exception.
+    """
+
+    def __init__(self, f: BinaryIO) -> None:
+        self._f = f
+        self._count = 0
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._f.write(b"[")
+        return self
+
+    def write(self, obj: Any) -> None:
+        """Appends one element, indented as an item of the array."""
+        separator = b",\n  " if self._count else b"\n  "
+        # JSON strings cannot contain raw newlines, so every newline is indentation
+        self._f.write(separator + to_json(obj).replace(b"\n", b"\n  "))
+        self._count += 1
+
+    def __exit__(self, *exc_info: Any) -> None:
+        # An interrupted run leaves the array open, so a partial result set
+        # does not parse as a complete one
+        if exc_info[0] is None:
+            self._f.write(b"\n]" if self._count else b"]")
@@ -2,6 +2,7 @@ import unittest
 import tempfile
 import os
 import json
+import importlib.util
 from pathlib import Path
 from audio_features.app import AudioProcessor
 
@@ -32,6 +33,23 @@ class TestAudioProcessor(unittest.TestCase):
         calculated_hash = self.processor.calculate_sha256(str(test_file_path))
         self.assertEqual(calculated_hash, expected_hash)
     
+    def test_sha256_memoization(self):
+        """Test that hashes are reused until the file changes."""
+        test_file_path = Path(self.temp_dir.name) / "test_file.txt"
+        with open(test_file_path, 'w') as f:
+            f.write("Test content")
+        
+        import hashlib
+        first_hash = self.processor.calculate_sha256(str(test_file_path))
+        self.assertEqual(self.processor.calculate_sha256(str(test_file_path)), first_hash)
+        self.assertEqual(len(self.processor._hash_cache), 1)
+        
+        # A modified file gets a new hash
+        with open(test_file_path, 'w') as f:
+            f.write("Changed test content")
+        changed_hash = self.processor.calculate_sha256(str(test_file_path))
+        self.assertEqual(changed_hash, hashlib.sha256(b"Changed test content").hexdigest())
+    
     def test_cache_functionality(self):
         """Test for cache functionality."""
         # Create a test file
@@ -62,14 +80,201 @@ class TestAudioProcessor(unittest.TestCase):
         self.processor.save_to_cache(str(test_file_path), dummy_result)
         
         # Check if file was created in cache directory
-        cache_files = list(self.cache_dir.glob("*.pickle"))
+        cache_files = list(self.cache_dir.glob("*.npz"))
         self.assertTrue(len(cache_files) > 0, "No cache file created")
         
         # Check if cache file has correct content
-        with open(cache_files[0], 'rb') as f:
-            import pickle
-            cached_data = pickle.load(f)
-            self.assertEqual(cached_data["features"]["mfcc"], [1, 2, 3])
+        import numpy as np
+        with np.load(cache_files[0], allow_pickle=False) as cached_data:
+            self.assertEqual(cached_data["mfcc"].tolist(), [1, 2, 3])
+    
+    def test_cache_roundtrip(self):
+        """Test that cached results are returned for the current build."""
+        from audio_features.app import BUILD_ID
+        test_file_path = Path(self.temp_dir.name) / "test_audio.flac"
+        with open(test_file_path, 'wb') as f:
+            f.write(b"Dummy FLAC content")
+        
+        result = {
+            "metadata": {"filename": test_file_path.name, "file_number": 1, "build_id": BUILD_ID},
+            "features": {"mfcc": [0.5, -1.5], "tempo": 120.0}
+        }
+        self.assertIsNone(self.processor.check_cache(str(test_file_path)))
+        self.processor.save_to_cache(str(test_file_path), result)
+        cached = self.processor.check_cache(str(test_file_path))
+        self.assertEqual(cached["metadata"], result["metadata"])
+        self.assertEqual(cached["features"]["mfcc"].tolist(), [0.5, -1.5])
+        self.assertEqual(cached["features"]["tempo"], 120.0)
+    
+    def test_cache_hit_uses_own_path(self):
+        """Test that identical files under different names keep their own path fields."""
+        import shutil
+        from audio_features.app import BUILD_ID
+        original_path = Path(self.temp_dir.name) / "a_stereo16.flac"
+        with open(original_path, 'wb') as f:
+            f.write(b"Dummy FLAC content")
+        copy_path = Path(self.temp_dir.name) / "z_copy_of_a.mp3"
+        shutil.copyfile(original_path, copy_path)
+        
+        result = {
+            "metadata": {"filename": original_path.name, "file_number": 1, "lossless": True, "build_id": BUILD_ID},
+            "features": {"mfcc": [0.5, -1.5], "tempo": 120.0}
+        }
+        self.processor.save_to_cache(str(original_path), result)
+        cached = self.processor.calculate_audio_features(str(copy_path), 7)
+        self.assertEqual(cached["metadata"]["filename"], copy_path.name)
+        self.assertEqual(cached["metadata"]["file_number"], 7)
+        self.assertFalse(cached["metadata"]["lossless"])
+        self.assertEqual(cached["features"]["tempo"], 120.0)
+    
+    def test_results_in_file_number_order(self):
+        """Test that files submitted largest first are written and returned in file_number order."""
+        import numpy as np
+        import soundfile as sf
+        
+        # Noise compresses poorly, so the file sizes follow the durations
+        rng = np.random.default_rng(0)
+        audio_dir = Path(self.temp_dir.name) / "audio"
+        audio_dir.mkdir()
+        durations = {"a.flac": 0.5, "b.flac": 3.0, "c.flac": 1.0, "d.flac": 4.0, "e.flac": 0.25}
+        for name, seconds in durations.items():
+            y = rng.standard_normal(int(seconds * 22050)).astype(np.float32) * 0.1
+            sf.write(audio_dir / name, y, 22050, subtype='PCM_16')
+        
+        output = Path(self.temp_dir.name) / "results.json"
+        processor = AudioProcessor(use_cache=False)
+        results = processor.process_audio_files(audio_dir, output)
+        with open(output) as f:
+            written = json.load(f)
+        
+        expected = [(i + 1, name) for i, name in enumerate(sorted(durations))]
+        for listing in (results, written):
+            self.assertEqual([(r["metadata"]["file_number"], r["metadata"]["filename"]) for r in listing], expected)
+    
+    def test_empty_directory_writes_no_output(self):
+        """Test that a directory without audio files leaves no output file."""
+        audio_dir = Path(self.temp_dir.name) / "empty"
+        audio_dir.mkdir()
+        output = Path(self.temp_dir.name) / "results.json"
+        self.assertEqual(self.processor.process_audio_files(audio_dir, output), [])
+        self.assertFalse(output.exists())
+    
+    def test_blake3_cache_key(self):
+        """Test that the BLAKE3 key names the cache entry and is memoized by stat."""
+        from unittest import mock
+        from audio_features.app import BUILD_ID
+        test_file_path = Path(self.temp_dir.name) / "test_audio.flac"
+        with open(test_file_path, 'wb') as f:
+            f.write(b"Dummy FLAC content")
+        
+        fake_blake3 = mock.MagicMock()
+        hasher = fake_blake3.blake3.return_value
+        hasher.update_mmap.return_value = hasher
+        hasher.hexdigest.return_value = "b3" * 32
+        
+        result = {
+            "metadata": {"filename": test_file_path.name, "file_number": 1, "build_id": BUILD_ID},
+            "features": {"mfcc": [0.5, -1.5]}
+        }
+        with mock.patch("audio_features.app.blake3", fake_blake3):
+            st = os.stat(test_file_path)
+            self.assertEqual(self.processor.calculate_cache_key(str(test_file_path), st), "b3" * 32)
+            self.processor.save_to_cache(str(test_file_path), result, st)
+            cached = self.processor.check_cache(str(test_file_path), st)
+        
+        self.assertTrue((self.cache_dir / f"{'b3' * 32}.npz").exists())
+        self.assertEqual(cached["features"]["mfcc"].tolist(), [0.5, -1.5])
+        # Hashed once; the later lookups for the same stat are memoized
+        hasher.update_mmap.assert_called_once_with(str(test_file_path))
+    
+class TestKernels(unittest.TestCase):
+    
+    def test_kernels_match_numpy_and_librosa(self):
+        """Test the numba kernels against their NumPy/librosa equivalents."""
+        import numpy as np
+        import librosa
+        from audio_features._kernels import mean_db_rows, mean_rows
+        
+        rng = np.random.default_rng(0)
+        S = (rng.random((40, 500), dtype=np.float32) ** 8) * 1e3
+        
+        np.testing.assert_allclose(mean_rows(S), S.mean(axis=1), rtol=1e-5)
+        expected = librosa.power_to_db(S, ref=np.max)
+        np.testing.assert_allclose(mean_db_rows(S), expected.mean(axis=1), rtol=1e-5, atol=1e-4)
+    
+class TestCore(unittest.TestCase):
+    
+    def test_mfcc_batch_matches_single(self):
+        """Test that batched MFCCs equal per-signal MFCCs."""
+        import numpy as np
+        from audio_features.core import compute_mfcc, compute_mfcc_batch
+        
+        rng = np.random.default_rng(0)
+        signals = [
+            rng.standard_normal(n).astype(np.float32) * scale
+            for n, scale in [(3 * 22050 + 17, 0.1), (5000, 1.0), (22050, 0.01)]
+        ]
+        batched = compute_mfcc_batch(signals, 22050, n_fft=2048, hop_length=512)
+        for y, means in zip(signals, batched):
+            np.testing.assert_allclose(means, compute_mfcc(y=y, sr=22050), atol=1e-4)
+    
+    @unittest.skipUnless(importlib.util.find_spec("torch"), "requires the optional torch dependency")
+    def test_mfcc_batch_torch_matches_librosa(self):
+        """Test that the PyTorch backend gives the same batched MFCCs as the librosa path."""
+        import numpy as np
+        from audio_features.core import compute_mfcc_batch
+        
+        rng = np.random.default_rng(0)
+        signals = [
+            rng.standard_normal(n).astype(np.float32) * scale
+            for n, scale in [(3 * 22050 + 17, 0.1), (5000, 1.0), (22050, 0.01)]
+        ]
+        expected = compute_mfcc_batch(signals, 22050, n_fft=2048, hop_length=512)
+        batched = compute_mfcc_batch(signals, 22050, n_fft=2048, hop_length=512, device="cpu")
+        for means, reference in zip(batched, expected):
+            np.testing.assert_allclose(means, reference, atol=3e-5)
+    
+    def test_mfcc_stream_matches_single(self):
+        """Test that MFCCs of a signal streamed in blocks equal those of the whole signal."""
+        import numpy as np
+        from audio_features.core import compute_mfcc, compute_mfcc_stream
+        
+        y = np.random.default_rng(0).standard_normal(100000).astype(np.float32) * 0.1
+        for blocksize in [100, 4096, len(y)]:
+            blocks = (y[i:i + blocksize] for i in range(0, len(y), blocksize))
+            np.testing.assert_allclose(compute_mfcc_stream(blocks, 22050), compute_mfcc(y=y, sr=22050), atol=1e-4)
+    
+    def test_mfcc_paths_stay_float32(self):
+        """Test that no MFCC path promotes the float32 pipeline to float64."""
+        import numpy as np
+        from audio_features.core import compute_mfcc, compute_mfcc_batch, compute_mfcc_stream
+        
+        y = np.random.default_rng(0).standard_normal(22050).astype(np.float32)
+        self.assertEqual(compute_mfcc(y=y, sr=22050).dtype, np.float32)
+        self.assertEqual(compute_mfcc_batch([y, y[:5000]], 22050)[0].dtype, np.float32)
+        self.assertEqual(compute_mfcc_stream([y[:10000], y[10000:]], 22050).dtype, np.float32)
+    
+    def test_json_array_writer_matches_to_json(self):
+        """Test that streamed JSON arrays equal the serialized list."""
+        import io
+        import numpy as np
+        from audio_features.core import JsonArrayWriter, to_json
+        
+        for items in [[], [{"a": 1}], [{"mfcc": np.arange(3, dtype=np.float32)}, {"title": "a\nb"}, [1, [2]]]]:
+            f = io.BytesIO()
+            with JsonArrayWriter(f) as writer:
+                for item in items:
+                    writer.write(item)
+            self.assertEqual(f.getvalue(), to_json(items))
+        
+        # An interrupted run must not leave a valid array behind
+        f = io.BytesIO()
+        with self.assertRaises(KeyboardInterrupt):
+            with JsonArrayWriter(f) as writer:
+                writer.write({"a": 1})
+                raise KeyboardInterrupt
+        with self.assertRaises(json.JSONDecodeError):
+            json.loads(f.getvalue())
     
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file